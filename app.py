@@ -2,11 +2,27 @@
 import re
 import json
 import requests
+import numpy as np
 import streamlit as st
-from datetime import datetime, timedelta, date
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import timedelta, date
 from typing import Dict, List, Tuple, Optional
+from numba import njit
 from streamlit_echarts import st_echarts
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+json_loads = orjson.loads if orjson else json.loads
+
+def json_dumps(obj) -> bytes:
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
 st.set_page_config(page_title="基金历史净值趋势 · Streamlit", page_icon="📈", layout="wide")
 
 DEFAULT_FUND_MAP: Dict[str, str] = {
@@ -30,6 +46,7 @@ RANGE_ITEMS = [
     {"key": "all", "label": "成立来", "days": None},
 ]
 RANGE_LABELS = {i["key"]: i["label"] for i in RANGE_ITEMS}
+RANGE_DAYS = {i["key"]: i["days"] for i in RANGE_ITEMS}
 
 MA_ITEMS = [
     {"key": "ma5",  "label": "MA5",  "win": 5},
@@ -38,82 +55,205 @@ MA_ITEMS = [
 ]
 MA_META = {i["key"]: i for i in MA_ITEMS}
 
-def ytd_start() -> date:
-    d = date.today()
-    return date(d.year, 1, 1)
+CST_OFFSET_MS = 8 * 3600 * 1000
+
+def is_fund_code(s: str) -> bool:
+    return len(s) == 6 and s.isdigit()
 
-def fmt_date(ts_ms: int) -> str:
-    return datetime.fromtimestamp(ts_ms/1000).strftime("%Y-%m-%d")
+def date_to_ms(d: date) -> int:
+    return int(np.datetime64(d, "ms").astype(np.int64)) - CST_OFFSET_MS
 
-def in_range(d: date, key: str) -> bool:
-    if key == "all":
-        return True
+def fmt_dates(ts_ms: np.ndarray) -> List[str]:
+    return np.datetime_as_string((ts_ms + CST_OFFSET_MS).astype("datetime64[ms]"), unit="D").tolist()
+
+def range_threshold_ms(key: str, today: date) -> Optional[int]:
     if key == "ytd":
-        return d >= ytd_start()
-    conf = next((x for x in RANGE_ITEMS if x["key"] == key), None)
-    if not conf or not conf["days"]:
-        return True
-    threshold = date.today() - timedelta(days=conf["days"])
-    return d >= threshold
-
-def moving_average(series: List[Tuple[int, float]], win: int) -> List[Tuple[int, Optional[float]]]:
-    out = []
+        return date_to_ms(date(today.year, 1, 1))
+    days = RANGE_DAYS.get(key)
+    if not days:
+        return None
+    return date_to_ms(today - timedelta(days=days))
+
+def to_chart_data(values: np.ndarray, decimals: int = 6) -> List[Optional[float]]:
+    values = np.round(values, decimals)
+    return np.where(np.isnan(values), None, values).tolist()
+
+def zoom_indices(dz: Dict, ts: np.ndarray) -> Tuple[int, int]:
+    n = len(ts)
+    s_idx, e_idx = 0, n - 1
+    if dz.get("startValue") is not None:
+        s_idx = min(n - 1, int(np.searchsorted(ts, dz["startValue"])))
+    if dz.get("endValue") is not None:
+        e_idx = max(0, int(np.searchsorted(ts, dz["endValue"], side="right")) - 1)
+    return (s_idx, e_idx) if s_idx <= e_idx else (e_idx, s_idx)
+
+def zoom_event_indices(event, n: int) -> Optional[Tuple[int, int]]:
+    if not isinstance(event, dict) or not n:
+        return None
+    if isinstance(event.get("startValue"), (int, float)) and isinstance(event.get("endValue"), (int, float)):
+        i0, i1 = event["startValue"], event["endValue"]
+    elif "start" in event and "end" in event:
+        i0, i1 = float(event["start"])/100 * (n-1), float(event["end"])/100 * (n-1)
+    else:
+        return None
+    i0, i1 = (max(0, min(n-1, round(i))) for i in (i0, i1))
+    return (i0, i1) if i0 <= i1 else (i1, i0)
+
+def align_by_ts(ts: np.ndarray, src_ts: np.ndarray, src_y: np.ndarray) -> np.ndarray:
+    if not len(src_ts):
+        return np.full(len(ts), np.nan)
+    idx = np.minimum(np.searchsorted(src_ts, ts), len(src_ts) - 1)
+    return np.where(src_ts[idx] == ts, src_y[idx], np.nan)
+
+@njit(cache=True, nogil=True, fastmath=True)
+def rolling_mean_1d(values, win, out):
     q_sum = 0.0
-    q: List[float] = []
-    for ts, v in series:
-        q.append(v)
-        q_sum += v
-        if len(q) > win:
-            q_sum -= q.pop(0)
-        out.append((ts, None if len(q) < win else (q_sum / len(q))))
+    for i in range(values.shape[0]):
+        q_sum += values[i]
+        if i >= win:
+            q_sum -= values[i - win]
+        if i >= win - 1:
+            out[i] = q_sum / win
+
+@st.cache_resource
+def rolling_mean_kernel():
+    rolling_mean_1d(np.zeros(1), 1, np.empty(1))
+    return rolling_mean_1d
+
+rolling_mean_kernel()
+
+def moving_average(values: np.ndarray, win: int) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    out[:win-1] = np.nan
+    rolling_mean_kernel()(values, win, out)
     return out
 
-def calc_extremes(rows: List[Dict]) -> Optional[Dict]:
-    n = len(rows)
+def calc_extremes(unit: np.ndarray, offset: int = 0) -> Optional[Dict]:
+    n = len(unit)
     if n < 2:
         return None
-    min_val = rows[0]["unit"]; min_idx = 0
-    max_gain = -1e18; gain_from = 0; gain_to = 0
-    for i in range(1, n):
-        v = rows[i]["unit"]
-        g = v / min_val - 1
-        if g > max_gain:
-            max_gain = g; gain_from = min_idx; gain_to = i
-        if v < min_val:
-            min_val = v; min_idx = i
-    max_val = rows[0]["unit"]; max_idx = 0
-    max_drawdown = 1e18; dd_from = 0; dd_to = 0
-    for i in range(1, n):
-        v = rows[i]["unit"]
-        d = v / max_val - 1
-        if d < max_drawdown:
-            max_drawdown = d; dd_from = max_idx; dd_to = i
-        if v > max_val:
-            max_val = v; max_idx = i
+    gain = unit[1:] / np.minimum.accumulate(unit)[:-1] - 1
+    gain_to = int(gain.argmax()) + 1
+    gain_from = int(unit[:gain_to].argmin())
+    max_gain = gain[gain_to-1]
+    drawdown = unit[1:] / np.maximum.accumulate(unit)[:-1] - 1
+    dd_to = int(drawdown.argmin()) + 1
+    dd_from = int(unit[:dd_to].argmax())
+    max_drawdown = drawdown[dd_to-1]
     return dict(
-        upPct=max_gain*100, upFrom=gain_from, upTo=gain_to,
-        downPct=max_drawdown*100, downFrom=dd_from, downTo=dd_to
+        upPct=float(max_gain)*100, upFrom=offset+gain_from, upTo=offset+gain_to,
+        downPct=float(max_drawdown)*100, downFrom=offset+dd_from, downTo=offset+dd_to
     )
 
 PINGZHONG_URL = "https://fund.eastmoney.com/pingzhongdata/{code}.js"
 PAT_NET = re.compile(r"var\s+Data_netWorthTrend\s*=\s*(\[[\s\S]*?\]);")
 PAT_ACC = re.compile(r"var\s+Data_ACWorthTrend\s*=\s*(\[[\s\S]*?\]);")
-PAT_NAME = re.compile(r'var\s+fS_name\s*=\s*"([^"]*)"\s*;')
-
-def fetch_pingzhong(code: str) -> Tuple[List[Dict], List[List], Optional[str]]:
+PAT_NAME = re.compile(r'var\s+fS_name\s*=\s*("[^"]*")\s*;')
+JS_OPENERS = {"];": "[", '";': '"'}
+
+def js_var_literal(text: str, var: str, close: str, pat: re.Pattern) -> Optional[str]:
+    head = text.find(f"var {var}")
+    if head >= 0:
+        head += len(var) + 4
+        eq = text.find("=", head)
+        end = text.find(close, eq + 1) if eq >= 0 else -1
+        if end >= 0 and not text[head:eq].strip():
+            value = text[eq+1:end+1].strip()
+            opener = JS_OPENERS[close]
+            if value[:1] == opener and (opener != '"' or '"' not in value[1:-1]):
+                return value
+    m = pat.search(text)
+    return m.group(1) if m else None
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    s = requests.Session()
+    s.headers["Accept-Encoding"] = "gzip"
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                    max_retries=Retry(total=2, backoff_factor=0.2)))
+    return s
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner="加载基金数据…")
+def fetch_pingzhong(code: str) -> Dict:
     url = PINGZHONG_URL.format(code=code)
-    resp = requests.get(url, timeout=12)
+    resp = http_session().get(url, timeout=(3, 8))
     resp.raise_for_status()
     text = resp.text
-    m1 = PAT_NET.search(text)
-    m2 = PAT_ACC.search(text)
-    if not (m1 and m2):
+    net_lit = js_var_literal(text, "Data_netWorthTrend", "];", PAT_NET)
+    acc_lit = js_var_literal(text, "Data_ACWorthTrend", "];", PAT_ACC)
+    if not (net_lit and acc_lit):
         raise ValueError("未解析到历史净值数据，请检查基金代码")
-    net = json.loads(m1.group(1))
-    acc = json.loads(m2.group(1))
-    mn = PAT_NAME.search(text)
-    name = mn.group(1).strip() if mn and mn.group(1) else None
-    return net, acc, name
+    net = json_loads(net_lit)
+    acc = json_loads(acc_lit)
+    name_lit = js_var_literal(text, "fS_name", '";', PAT_NAME)
+    try:
+        name = json_loads(name_lit).strip() if name_lit else None
+    except ValueError:
+        name = None
+    return dict(
+        net_ts=np.fromiter((o["x"] for o in net), dtype=np.int64, count=len(net)),
+        net_y=np.fromiter((o["y"] for o in net), dtype=np.float64, count=len(net)),
+        acc_ts=np.fromiter((r[0] for r in acc), dtype=np.int64, count=len(acc)),
+        acc_y=np.fromiter((r[1] for r in acc), dtype=np.float64, count=len(acc)),
+        name=name,
+    )
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def build_view(code: str, threshold_ms: Optional[int]) -> Dict:
+    data = fetch_pingzhong(code)
+    ts, unit = data["net_ts"], data["net_y"]
+    if threshold_ms is not None:
+        lo = int(np.searchsorted(ts, threshold_ms))
+        ts, unit = ts[lo:], unit[lo:]
+    return dict(
+        ts=ts,
+        unit=unit,
+        acc=align_by_ts(ts, data["acc_ts"], data["acc_y"]),
+        dates=fmt_dates(ts),
+    )
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def base_option_json(code: str, threshold_ms: Optional[int]) -> bytes:
+    view = build_view(code, threshold_ms)
+    return json_dumps({
+        "backgroundColor": "#ffffff",
+        "grid": {"left": 44, "right": 20, "top": 28, "bottom": 48},
+        "tooltip": {"trigger": "axis"},
+        "legend": {"data": ["单位净值", "累计净值"], "top": 0, "textStyle": {"color": "#374151"},
+                   "selected": {"单位净值": True, "累计净值": False}},
+        "xAxis": {"type": "category", "data": view["dates"], "boundaryGap": False,
+                  "axisLabel": {"color": "#6B7280", "hideOverlap": True}},
+        "yAxis": {"type": "value", "scale": True,
+                  "axisLabel": {"color": "#6B7280"},
+                  "splitLine": {"lineStyle": {"color": "#F3F4F6"}}},
+        "series": [
+            {"name": "单位净值", "type": "line", "smooth": True, "showSymbol": False, "sampling": "lttb",
+             "data": to_chart_data(view["unit"]), "lineStyle": {"width": 2}},
+            {"name": "累计净值", "type": "line", "smooth": True, "showSymbol": False, "sampling": "lttb",
+             "data": to_chart_data(view["acc"]), "lineStyle": {"width": 2}},
+        ],
+    })
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def chart_option_json(code: str, threshold_ms: Optional[int], mas: Tuple[str, ...]) -> bytes:
+    unit = build_view(code, threshold_ms)["unit"]
+    option = json_loads(base_option_json(code, threshold_ms))
+
+    series = option["series"]
+    for key in mas:
+        series.append({
+            "name": key.upper(),
+            "type": "line",
+            "smooth": True,
+            "showSymbol": False,
+            "sampling": "lttb",
+            "data": to_chart_data(moving_average(unit, MA_META[key]["win"])),
+            "lineStyle": {"width": 1.5, "type": "dashed"},
+            "emphasis": {"focus": "series"}
+        })
+    option["legend"]["data"] += [k.upper() for k in mas]
+    return json_dumps(option)
 
 if "fund_map" not in st.session_state:
     st.session_state.fund_map = DEFAULT_FUND_MAP.copy()
@@ -122,7 +262,9 @@ if "range_key" not in st.session_state:
 if "enabled_mas" not in st.session_state:
     st.session_state.enabled_mas = set()
 if "datazoom" not in st.session_state:
-    st.session_state.datazoom = {"start": 0, "end": 100}
+    st.session_state.datazoom = {"startValue": None, "endValue": None}
+if "zoom_seq" not in st.session_state:
+    st.session_state.zoom_seq = None
 if "sel_code" not in st.session_state:
     st.session_state.sel_code = "110022"
 
@@ -134,10 +276,10 @@ with st.sidebar:
     if up is not None:
         try:
             data = json.load(up)
-            new_map = {}
-            for k, v in (data or {}).items():
-                if re.fullmatch(r"\d{6}", str(k)) and isinstance(v, str) and v.strip():
-                    new_map[str(k)] = v.strip()
+            new_map = {
+                str(k): v.strip() for k, v in (data or {}).items()
+                if is_fund_code(str(k)) and isinstance(v, str) and v.strip()
+            }
             if not new_map:
                 st.error("配置为空或格式不符合要求")
             else:
@@ -148,10 +290,13 @@ with st.sidebar:
 
     st.markdown("##### 输入 6 位基金代码（直接抓取）")
     code = st.text_input("基金代码", value=st.session_state.sel_code, max_chars=6).strip()
-    if re.fullmatch(r"\d{6}", code):
+    if is_fund_code(code):
         st.session_state.sel_code = code
     else:
         st.warning("请输入 6 位数字代码")
+    if st.button("刷新数据"):
+        st.cache_data.clear()
+        st.rerun()
 
     st.markdown("##### 快速选择（不会覆盖输入，需点按钮）")
     codes_sorted = sorted(st.session_state.fund_map.keys())
@@ -173,7 +318,7 @@ with st.sidebar:
     )
     if range_key != st.session_state.range_key:
         st.session_state.range_key = range_key
-        st.session_state.datazoom = {"start": 0, "end": 100}
+        st.session_state.datazoom = {"startValue": None, "endValue": None}
 
     st.markdown("##### 指标")
     all_on = st.checkbox("全选", value=len(st.session_state.enabled_mas) == len(MA_ITEMS))
@@ -199,7 +344,7 @@ with left:
     with col_a:
         if st.button("今年"):
             st.session_state.range_key = "ytd"
-            st.session_state.datazoom = {"start": 0, "end": 100}
+            st.session_state.datazoom = {"startValue": None, "endValue": None}
             st.rerun()
 
     status = st.empty()
@@ -207,10 +352,11 @@ with left:
 
     try:
         status.info("加载中…")
-        net_raw, acc_raw, fetched_name = fetch_pingzhong(sel_code)
+        data = fetch_pingzhong(sel_code)
+        fetched_name = data["name"]
         if fetched_name:
             st.session_state.fund_map[sel_code] = fetched_name
-        status.success(f"数据就绪（单位净值 {len(net_raw)} 条，累计净值 {len(acc_raw)} 条）")
+        status.success(f"数据就绪（单位净值 {len(data['net_ts'])} 条，累计净值 {len(data['acc_ts'])} 条）")
     except Exception as e:
         status.empty()
         errbox.error(str(e))
@@ -219,53 +365,32 @@ with left:
     fund_name = st.session_state.fund_map.get(sel_code, fetched_name or "")
     st.markdown(f"### {sel_code} · {fund_name}")
 
-    acc_map = {int(ts): float(v) for ts, v in acc_raw}
-    rows_all = []
-    for obj in net_raw:
-        ts = int(obj.get("x"))
-        d = datetime.fromtimestamp(ts/1000).date()
-        if in_range(d, st.session_state.range_key):
-            rows_all.append(dict(
-                ts=ts,
-                date=fmt_date(ts),
-                unit=float(obj.get("y")),
-                acc=acc_map.get(ts, None)
-            ))
-    rows_all.sort(key=lambda r: r["ts"])
+    threshold_ms = range_threshold_ms(st.session_state.range_key, date.today())
+    view = build_view(sel_code, threshold_ms)
+    dates = view["dates"]
+    n = len(dates)
 
     st.caption(
-        f"区间：{rows_all[0]['date']} ~ {rows_all[-1]['date']}（{len(rows_all)} 日）"
-        if rows_all else "所选区间暂无数据"
+        f"区间：{dates[0]} ~ {dates[-1]}（{n} 日）"
+        if n else "所选区间暂无数据"
     )
 
-    net_series = [(r["ts"], r["unit"]) for r in rows_all]
-    ma_series_map = {}
-    for key in st.session_state.enabled_mas:
-        ma_series_map[key] = moving_average(net_series, MA_META[key]["win"])
-
-    x = [r["date"] for r in rows_all]
-    y_unit = [r["unit"] for r in rows_all]
-    y_acc = [r["acc"] for r in rows_all]
-
-    dz = st.session_state.datazoom or {"start": 0, "end": 100}
-    if rows_all:
-        n = len(rows_all)
-        s_idx = max(0, min(n-1, round(dz["start"]/100 * (n-1))))
-        e_idx = max(0, min(n-1, round(dz["end"]/100 * (n-1))))
-        if e_idx < s_idx:
-            s_idx, e_idx = e_idx, s_idx
-        rows_visible = rows_all[s_idx:e_idx+1]
-    else:
-        rows_visible = []
+    dz = st.session_state.datazoom or {"startValue": None, "endValue": None}
+    visible = None
+    s_idx = e_idx = 0
+    if n:
+        s_idx, e_idx = zoom_indices(dz, view["ts"])
+        visible = (s_idx, e_idx)
 
-    ex = calc_extremes(rows_visible) if rows_visible else None
+    mas = tuple(k for k in MA_META if k in st.session_state.enabled_mas)
+    ex = calc_extremes(view["unit"][s_idx:e_idx+1], s_idx)
 
     mark_areas = []
-    if rows_visible and ex:
-        up_start = rows_visible[ex["upFrom"]]["date"]
-        up_end   = rows_visible[ex["upTo"]]["date"]
-        dn_start = rows_visible[ex["downFrom"]]["date"]
-        dn_end   = rows_visible[ex["downTo"]]["date"]
+    if ex:
+        up_start = dates[ex["upFrom"]]
+        up_end   = dates[ex["upTo"]]
+        dn_start = dates[ex["downFrom"]]
+        dn_end   = dates[ex["downTo"]]
         if highlight_up:
             mark_areas.append([
                 {"itemStyle": {"color": "rgba(244,63,94,0.18)"}, "xAxis": up_start},
@@ -277,76 +402,52 @@ with left:
                 {"xAxis": dn_end}
             ])
 
-    series = [
-        {"name": "单位净值", "type": "line", "smooth": True, "showSymbol": False,
-         "data": y_unit, "lineStyle": {"width": 2},
-         "markArea": {"silent": True, "data": mark_areas}},
-        {"name": "累计净值", "type": "line", "smooth": True, "showSymbol": False,
-         "data": y_acc, "lineStyle": {"width": 2}},
+    option = json_loads(chart_option_json(sel_code, threshold_ms, mas))
+    option["series"][0]["markArea"] = {"silent": True, "data": mark_areas}
+    option["dataZoom"] = [
+        {"type": "inside", "startValue": s_idx, "endValue": e_idx},
+        {"type": "slider", "height": 24, "bottom": 8, "startValue": s_idx, "endValue": e_idx}
     ]
-    for key, arr in ma_series_map.items():
-        m = {int(ts): v for ts, v in arr}
-        y = [(None if m.get(r["ts"]) is None else round(float(m.get(r["ts"])), 6)) for r in rows_all]
-        series.append({
-            "name": key.upper(),
-            "type": "line",
-            "smooth": True,
-            "showSymbol": False,
-            "data": y,
-            "lineStyle": {"width": 1.5, "type": "dashed"},
-            "emphasis": {"focus": "series"}
-        })
-
-    legend_items = ["单位净值", "累计净值"] + [k.upper() for k in st.session_state.enabled_mas]
-
-    option = {
-        "backgroundColor": "#ffffff",
-        "grid": {"left": 44, "right": 20, "top": 28, "bottom": 48},
-        "tooltip": {"trigger": "axis"},
-        "legend": {"data": legend_items, "top": 0, "textStyle": {"color": "#374151"},
-                   "selected": {"单位净值": True, "累计净值": False}},
-        "xAxis": {"type": "category", "data": x, "boundaryGap": False,
-                  "axisLabel": {"color": "#6B7280", "hideOverlap": True}},
-        "yAxis": {"type": "value", "scale": True,
-                  "axisLabel": {"color": "#6B7280"},
-                  "splitLine": {"lineStyle": {"color": "#F3F4F6"}}},
-        "dataZoom": [
-            {"type": "inside", "start": st.session_state.datazoom["start"], "end": st.session_state.datazoom["end"]},
-            {"type": "slider", "height": 24, "bottom": 8, "start": st.session_state.datazoom["start"], "end": st.session_state.datazoom["end"]}
-        ],
-        "series": series,
-    }
 
     events = {
         "datazoom": """
             function(params) {
                 var p = params;
                 if (Array.isArray(params.batch) && params.batch.length > 0) { p = params.batch[0]; }
-                return {start: p.start, end: p.end};
+                return {start: p.start, end: p.end, startValue: p.startValue, endValue: p.endValue,
+                        seq: Date.now() + Math.random()};
             }
         """
     }
 
     event = st_echarts(options=option, height="480px", events=events, key=f"chart-{sel_code}-{st.session_state.range_key}")
-    if isinstance(event, dict) and "start" in event and "end" in event:
-        st.session_state.datazoom = {"start": float(event["start"]), "end": float(event["end"])}
+    if isinstance(event, dict) and event.get("seq") != st.session_state.zoom_seq:
+        st.session_state.zoom_seq = event.get("seq")
+        zoomed = zoom_event_indices(event, n)
+        if zoomed:
+            ts = view["ts"]
+            st.session_state.datazoom = {
+                "startValue": int(ts[zoomed[0]]) if zoomed[0] > 0 else None,
+                "endValue": int(ts[zoomed[1]]) if zoomed[1] < n - 1 else None,
+            }
+            st.rerun()
 
 with right:
     st.markdown("#### 数据看板")
-    if rows_visible:
-        st.write(f"**起始日期：** {rows_visible[0]['date']}")
-        st.write(f"**结束日期：** {rows_visible[-1]['date']}")
+    if visible:
+        st.write(f"**起始日期：** {dates[visible[0]]}")
+        st.write(f"**结束日期：** {dates[visible[1]]}")
     else:
         st.write("**起始日期：** -")
         st.write("**结束日期：** -")
 
     st.divider()
 
-    if ex and rows_visible:
+    if ex:
         up_pct = ("+" if ex["upPct"] >= 0 else "") + f"{ex['upPct']:.2f}%"
         down_pct = f"{ex['downPct']:.2f}%"
-        up_from, up_to = rows_visible[ex["upFrom"]]["date"], rows_visible[ex["upTo"]]["date"]
-        down_from, down_to = rows_visible[ex["downFrom"]]["date"], rows_visible[ex["downTo"]]["date"]
+        up_from, up_to = dates[ex["upFrom"]], dates[ex["upTo"]]
+        down_from, down_to = dates[ex["downFrom"]], dates[ex["downTo"]]
         up_days = ex["upTo"] - ex["upFrom"] + 1
         down_days = ex["downTo"] - ex["downFrom"] + 1
 